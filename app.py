@@ -1,12 +1,17 @@
 import os
 import re
-import json
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, MutableMapping, Optional, Tuple
 
+import orjson
 import requests
-from flask import Flask, request, jsonify
+from cachetools import TTLCache
+from flask import Flask
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 app = Flask(__name__)
 
@@ -14,47 +19,317 @@ app = Flask(__name__)
 
 TP_WEBHOOK_URL = os.getenv("TP_WEBHOOK_URL", "")
 
-logging.basicConfig(level=logging.INFO)
+def _parse_log_level(value: str) -> Optional[int]:
+    """Accept a level name (any case) or number; None if unrecognized."""
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else None
+
+
+# Every log call is %-style, so setting LOG_LEVEL=WARNING in production skips
+# formatting payloads/bodies on the hot path entirely.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+_log_level = _parse_log_level(LOG_LEVEL)
+logging.basicConfig(level=logging.INFO if _log_level is None else _log_level)
 logger = logging.getLogger(__name__)
+if _log_level is None:
+    logger.warning("Unknown LOG_LEVEL %r, falling back to INFO", LOG_LEVEL)
+
+
+def _parse_seconds(value: str) -> Optional[float]:
+    """Accept a positive, finite number of seconds; None if invalid."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    return seconds if 0 < seconds < float("inf") else None
+
+
+def _env_seconds(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    seconds = _parse_seconds(raw)
+    if seconds is None:
+        logger.warning("Invalid %s %r, falling back to %.1f", name, raw, default)
+        return default
+    return seconds
+
+
+# Chart bar length in seconds. A parked Titan trade waits for the next EMA
+# update, which arrives once per bar, so by default it may wait two bars
+# before it is considered stale (override with PENDING_TRADE_TTL).
+BAR_INTERVAL_SEC = _env_seconds("BAR_INTERVAL_SEC", 60.0)
+PENDING_TRADE_TTL = _env_seconds("PENDING_TRADE_TTL", 2 * BAR_INTERVAL_SEC)
+
+# Per-ticker concurrency (locks, TradersPost queues) is striped: a ticker
+# always maps to the same one of TICKER_STRIPES slots.
+TICKER_STRIPES = 16
+
+
+def ticker_stripe(ticker: str) -> int:
+    return hash(ticker) % TICKER_STRIPES
+
+
+# Shared HTTP session so TCP/TLS connections to TradersPost are reused
+# across webhook calls instead of re-handshaking on every POST. Up to one
+# POST per stripe can be in flight (see TP_EXECUTORS), so the pool keeps
+# that many connections; a smaller pool would discard the extras.
+TP_SESSION = requests.Session()
+TP_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=TICKER_STRIPES,
+        max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504]),
+    ),
+)
+
+# TradersPost POSTs run in the background so the webhook can answer
+# TradingView right away. Each stripe has its own single-worker executor:
+# a ticker's orders stay in arrival order (an exit never overtakes the entry
+# that follows it), while a slow POST only delays tickers on its own stripe.
+TP_EXECUTORS = [
+    ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tp{i}") for i in range(TICKER_STRIPES)
+]
+
+# ------------ STATE ------------
+
+# Serialized /dashboard body, rebuilt only after some state write or TTL
+# expiry (see ShardedState.expire).
+_DASHBOARD_CACHE: Dict[str, Any] = {"bytes": None, "dirty": True}
+_DASHBOARD_LOCK = threading.Lock()
+
+
+def _mark_dashboard_dirty() -> None:
+    _DASHBOARD_CACHE["dirty"] = True
+
+
+class _ReportingTTLCache(TTLCache):
+    """TTLCache that hands every expired or evicted entry to a callback."""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[str, Dict[str, Any]], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._on_evict = on_evict
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired:
+            self._on_evict(key, value)
+        return expired
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key, value)
+        return key, value
+
+
+class ShardedState:
+    """
+    Per-ticker dict split into lock-striped shards.
+
+    Each ticker hashes to one shard, so request threads touching different
+    tickers never contend on the same lock.
+    """
+
+    def __init__(
+        self,
+        shards: int = 16,
+        ttl: Optional[float] = None,
+        maxsize: int = 4096,
+        on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        # With a ttl each shard is a TTLCache (maxsize split evenly), so
+        # entries expire and the mapping can't grow without bound. on_evict,
+        # if given, sees every entry dropped by expiry or size eviction.
+        if ttl is not None:
+            per_shard = max(1, maxsize // shards)
+            self._shards: List[MutableMapping[str, Dict[str, Any]]] = [
+                TTLCache(maxsize=per_shard, ttl=ttl)
+                if on_evict is None
+                else _ReportingTTLCache(per_shard, ttl, on_evict)
+                for _ in range(shards)
+            ]
+        else:
+            self._shards = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _index(self, ticker: str) -> int:
+        return hash(ticker) % len(self._shards)
+
+    def get(self, ticker: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        i = self._index(ticker)
+        with self._locks[i]:
+            return self._shards[i].get(ticker, default)
+
+    def set(self, ticker: str, value: Dict[str, Any]) -> None:
+        i = self._index(ticker)
+        with self._locks[i]:
+            self._shards[i][ticker] = value
+        _mark_dashboard_dirty()
+
+    def update(self, ticker: str, fields: Dict[str, Any]) -> None:
+        """Update the ticker's dict in place, creating it on first sighting."""
+        i = self._index(ticker)
+        with self._locks[i]:
+            current = self._shards[i].get(ticker)
+            if current is None:
+                self._shards[i][ticker] = fields
+            else:
+                current.update(fields)
+        _mark_dashboard_dirty()
+
+    def pop(self, ticker: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        i = self._index(ticker)
+        with self._locks[i]:
+            shard = self._shards[i]
+            if isinstance(shard, TTLCache):
+                # An expired entry is invisible to pop(); purge it first so it
+                # is removed (and reported) now rather than lingering.
+                shard.expire()
+            value = shard.pop(ticker, default)
+        if value is not default:
+            _mark_dashboard_dirty()
+        return value
+
+    def expire(self) -> int:
+        """Purge expired TTL entries now; returns how many were removed."""
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            if isinstance(shard, TTLCache):
+                with lock:
+                    removed += len(shard.expire())
+        if removed:
+            _mark_dashboard_dirty()
+        return removed
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Merge all shards into a plain dict, holding each lock only briefly."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                if isinstance(shard, TTLCache):
+                    shard.expire()
+                # .get() tolerates an entry expiring between key listing and
+                # lookup, where TTLCache.__getitem__ would raise KeyError.
+                for k in list(shard):
+                    v = shard.get(k)
+                    if v is not None:
+                        merged[k] = v
+        return merged
+
+
+# Per-ticker locks serializing each ticker's read-modify-write flows
+# (position check -> orders -> state update, pending store/consume) while
+# unrelated tickers proceed in parallel.
+_TICKER_LOCKS = [threading.Lock() for _ in range(TICKER_STRIPES)]
+
+
+def ticker_lock(ticker: str) -> threading.Lock:
+    return _TICKER_LOCKS[ticker_stripe(ticker)]
+
 
 # Latest EMA state per ticker
-EMA_STATE: Dict[str, Dict[str, Any]] = {}
+EMA_STATE = ShardedState()
 
-# Last trade / events (optional debugging)
-LAST_TRADES: Dict[str, Dict[str, Any]] = {}
+# Last trade / events (optional debugging); bounded, kept for an hour
+LAST_TRADES = ShardedState(ttl=3600)
 
 # Simple position state per ticker
-POSITION_STATE: Dict[str, Dict[str, Any]] = {}
+POSITION_STATE = ShardedState()
+
+
+def report_dropped_pending_trade(ticker: str, pending: Dict[str, Any]) -> float:
+    """Log and record a parked Titan trade that is dropped unfired; returns its age."""
+    age = monotonic_ts() - pending["created_mono"]
+    logger.warning(
+        "Dropping unfired pending trade for %s (age=%.1fs, ttl=%.1fs): %s", ticker, age, PENDING_TRADE_TTL, pending
+    )
+    LAST_TRADES.set(ticker, {
+        "event": "pending_trade_expired",
+        "price": pending.get("price"),
+        "time": pending.get("time"),
+        "age": age,
+    })
+    return age
 
-# Titan “New Trade Design” waiting for next EMA update
-PENDING_TRADES: Dict[str, Dict[str, Any]] = {}
+
+# Titan “New Trade Design” waiting for next EMA update. One older than
+# PENDING_TRADE_TTL is dropped when its EMA update arrives; entries whose
+# ticker never updates again are purged after a few TTLs (and the cache is
+# size-capped), and every such drop is reported too.
+PENDING_TRADES = ShardedState(ttl=4 * PENDING_TRADE_TTL, on_evict=report_dropped_pending_trade)
 
 # ------------ HELPERS ------------
 
-def utc_ts() -> float:
-    return datetime.now(timezone.utc).timestamp()
+def monotonic_ts() -> float:
+    """
+    Clock for EMA freshness / pending-trade ages; immune to wall-clock jumps.
+
+    Only meaningful as a difference, so state also keeps a time.time() value
+    for display.
+    """
+    return time.monotonic()
 
 
 def send_to_traderspost(payload: dict) -> dict:
-    """Send payload to TradersPost webhook."""
+    """Send payload to TradersPost webhook (blocking)."""
     if not TP_WEBHOOK_URL:
         logger.error("TP_WEBHOOK_URL not set")
         return {"ok": False, "error": "TP_WEBHOOK_URL not set"}
 
     try:
         logger.info("Sending to TradersPost: %s", payload)
-        resp = requests.post(TP_WEBHOOK_URL, json=payload, timeout=5)
+        resp = TP_SESSION.post(TP_WEBHOOK_URL, json=payload, timeout=5)
         return {"ok": resp.ok, "status_code": resp.status_code, "body": resp.text}
     except Exception as e:
         logger.exception("Error sending to TradersPost: %s", e)
         return {"ok": False, "error": str(e)}
 
 
+def send_to_traderspost_async(payload: dict) -> Future:
+    """Queue payload on its ticker's stripe; the Future resolves to the result dict."""
+    return TP_EXECUTORS[ticker_stripe(payload["ticker"])].submit(send_to_traderspost, payload)
+
+
+def _store_tp_result(entry: Dict[str, Any], key: str) -> Callable[[Future], None]:
+    """Done-callback that records a TradersPost result into a LAST_TRADES entry."""
+    def _done(fut: Future) -> None:
+        entry[key] = fut.result()
+        _mark_dashboard_dirty()
+    return _done
+
+
+# Exact string spellings seen in practice resolve with one hash lookup;
+# anything else (numbers, padding, odd casing) falls back to the normalizing
+# path below, so e.g. 1 -> "1" is true but 1.0 -> "1.0" is not.
+_TRUTHY = frozenset({"true", "True", "TRUE", "1", "yes", "y", "t"})
+_FALSY = frozenset({"false", "False", "FALSE", "0", "no", "n", "f", ""})
+
+
 def _parse_boolish(v: Any) -> bool:
+    if v.__class__ is bool:  # JSON true/false: nothing to decode
+        return v
+    if v.__class__ is str:
+        if v in _TRUTHY:
+            return True
+        if v in _FALSY:
+            return False
     s = str(v).strip().lower()
     return s in ("true", "1", "yes", "y", "t")
 
 
+def _safe_float(v: Any, default: float = 0.0) -> float:
+    if isinstance(v, (int, float)):  # JSON numbers: no try/except needed
+        return float(v)
+    try:
+        return float(v)
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
 def update_ema_state_from_json(data: dict) -> Optional[str]:
     """Update EMA_STATE from JSON and return ticker name."""
     ticker = data.get("ticker")
@@ -62,107 +337,122 @@ def update_ema_state_from_json(data: dict) -> Optional[str]:
         logger.warning("ema_update without ticker: %s", data)
         return None
 
-    above13 = _parse_boolish(data.get("above13", data.get("above", "")))
+    # Producer sends "above13"; "above" is only a legacy fallback, so don't
+    # look it up unless needed.
+    above13 = _parse_boolish(data["above13"] if "above13" in data else data.get("above", ""))
 
-    try:
-        ema13 = float(data.get("ema13", 0.0))
-    except Exception:
-        ema13 = 0.0
+    ema13 = _safe_float(data.get("ema13"))
+    close = _safe_float(data.get("close"))
 
-    try:
-        close = float(data.get("close", 0.0))
-    except Exception:
-        close = 0.0
-
-    EMA_STATE[ticker] = {
+    state = {
         "above13": above13,
+        # Trade direction derived once here instead of on every Titan alert
+        "direction": "buy" if above13 else "sell",
         "ema13": ema13,
         "close": close,
         "time": data.get("time", ""),
-        "received_at": utc_ts(),
+        "received_at": time.time(),  # wall clock, for display
+        "received_mono": monotonic_ts(),  # for the freshness check
     }
+    EMA_STATE.update(ticker, state)
 
-    logger.info("Updated EMA state for %s: %s", ticker, EMA_STATE[ticker])
+    logger.info("Updated EMA state for %s: %s", ticker, state)
     return ticker
 
 
+def ema_snapshot(ticker: str) -> Optional[Dict[str, Any]]:
+    """Copy of the ticker's EMA state; the live entry is updated in place."""
+    state = EMA_STATE.get(ticker)
+    return dict(state) if state else None
+
+
 def desired_direction_from_ema(ticker: str) -> Optional[str]:
     """Return 'buy' or 'sell' based on EMA_STATE above13, or None if missing."""
     state = EMA_STATE.get(ticker)
     if not state:
         return None
-    return "buy" if bool(state.get("above13", False)) else "sell"
+    return state["direction"]
 
 
 # ------------ PARSERS (TITAN TEXT) ------------
 
 # Updated ticker regex to support common TradingView formats like:
 # ES1! / CME_MINI:MNQZ2025 / BINANCE:BTCUSDT / etc.
-TICKER_PATTERN = r"(?P<ticker>[A-Za-z0-9:_\.\-!]+)"
-
-# Example:  MNQZ2025 New Trade Design , Price = 25787.50
-TITAN_RE = re.compile(
-    TICKER_PATTERN + r"\s+New Trade Design\s*,\s*Price\s*=\s*(?P<price>[0-9.]+)"
+TICKER_PATTERN = rb"(?P<ticker>[A-Za-z0-9:_\.\-!]+)"
+
+# Examples:
+#   MNQZ2025 New Trade Design , Price = 25787.50
+#   MNQZ2025 Exit Signal , Price = 25787.00
+# Both alert kinds are matched by one alternation so the body is scanned once.
+# The comma is mandatory for New Trade Design and optional for Exit Signal.
+# Alerts always start with the ticker (after optional leading whitespace), so
+# the pattern is anchored (use .match) and the body is never copied to strip it.
+# Compiled on bytes: alert bodies are matched without decoding them first.
+ALERT_RE = re.compile(
+    rb"\A\s*"
+    + TICKER_PATTERN
+    + rb"\s+(?P<kind>New Trade Design(?=\s*,)|Exit Signal)\s*,?\s*Price\s*=\s*(?P<price>\d+(?:\.\d+)?)"
 )
 
-# Example:  MNQZ2025 Exit Signal , Price = 25787.00
-EXIT_RE = re.compile(
-    TICKER_PATTERN + r"\s+Exit Signal\s*,?\s*Price\s*=\s*(?P<price>[0-9.]+)"
-)
+ALERT_NEW_TRADE = "New Trade Design"
+ALERT_EXIT = "Exit Signal"
+_ALERT_NEW_TRADE_B = ALERT_NEW_TRADE.encode()
+_ALERT_EXIT_B = ALERT_EXIT.encode()
 
 
-def parse_titan_new_trade(text: str) -> Dict[str, Any]:
-    m = TITAN_RE.search(text)
-    if not m:
-        return {}
-    return {"ticker": m.group("ticker"), "price": float(m.group("price"))}
-
+def parse_alert(text: bytes) -> Optional[Tuple[str, str, float]]:
+    """Parse a raw Titan / Exit text alert into (kind, ticker, price)."""
+    # Cheap literal prescreen: every alert carries "Price" plus one of the two
+    # kind literals, so noise bodies never reach the regex engine.
+    if b"Price" not in text or (_ALERT_NEW_TRADE_B not in text and _ALERT_EXIT_B not in text):
+        return None
 
-def parse_exit_signal(text: str) -> Dict[str, Any]:
-    m = EXIT_RE.search(text)
+    m = ALERT_RE.match(text)
     if not m:
-        return {}
-    return {"ticker": m.group("ticker"), "price": float(m.group("price"))}
+        return None
+    kind, ticker, price = m.group("kind", "ticker", "price")
+    return kind.decode("ascii"), ticker.decode("ascii"), float(price)
 
 
 # ------------ TRADE HANDLING ------------
 
-def flatten_position(ticker: str, price: Optional[float], time_str: Optional[str]) -> dict:
-    """Exit 1 contract (single-contract trader)."""
+def flatten_position(ticker: str, price: Optional[float], time_str: Optional[str]) -> Future:
+    """Queue exit of 1 contract (single-contract trader)."""
     payload: Dict[str, Any] = {"ticker": ticker, "action": "exit", "quantity": 1}
     if price is not None:
         payload["price"] = price
 
-    result = send_to_traderspost(payload)
+    fut = send_to_traderspost_async(payload)
 
-    POSITION_STATE[ticker] = {
+    POSITION_STATE.update(ticker, {
         "open": False,
         "direction": None,
         "qty": 0,
         "closed_time": time_str,
         "price": price,
-    }
+    })
 
-    return {"ok": result.get("ok", False), "tp_result": result, "exited_qty": 1}
+    return fut
 
 
-def enter_position(ticker: str, direction: str, price: Optional[float], time_str: Optional[str]) -> dict:
-    """Enter 1 contract (single-contract trader)."""
+def enter_position(ticker: str, direction: str, price: Optional[float], time_str: Optional[str]) -> Future:
+    """Queue entry of 1 contract (single-contract trader)."""
     payload: Dict[str, Any] = {"ticker": ticker, "action": direction, "quantity": 1}
     if price is not None:
         payload["price"] = price
 
-    result = send_to_traderspost(payload)
+    fut = send_to_traderspost_async(payload)
 
-    POSITION_STATE[ticker] = {
+    POSITION_STATE.update(ticker, {
         "open": True,
         "direction": direction,
         "qty": 1,
         "opened_time": time_str,
+        "closed_time": None,
         "price": price,
-    }
+    })
 
-    return {"ok": result.get("ok", False), "tp_result": result, "entered_qty": 1}
+    return fut
 
 
 def handle_new_trade_for_ticker(ticker: str, price: Optional[float], time_str: Optional[str]) -> dict:
@@ -183,35 +473,39 @@ def handle_new_trade_for_ticker(ticker: str, price: Optional[float], time_str: O
         current_dir = pos.get("direction")
         logger.info("New Trade Design on %s while in %s. Flatten then enter %s.", ticker, current_dir, desired)
 
-        exit_res = flatten_position(ticker, price, time_str)
-        entry_res = enter_position(ticker, desired, price, time_str)
+        exit_fut = flatten_position(ticker, price, time_str)
+        entry_fut = enter_position(ticker, desired, price, time_str)
 
-        LAST_TRADES[ticker] = {
+        trade: Dict[str, Any] = {
             "event": "flatten_then_new_entry",
             "from": current_dir,
             "to": desired,
             "price": price,
             "time": time_str,
-            "exit": exit_res,
-            "entry": entry_res,
-            "ema_snapshot": EMA_STATE.get(ticker),
+            "exit": None,
+            "entry": None,
+            "ema_snapshot": ema_snapshot(ticker),
         }
+        LAST_TRADES.set(ticker, trade)
+        exit_fut.add_done_callback(_store_tp_result(trade, "exit"))
+        entry_fut.add_done_callback(_store_tp_result(trade, "entry"))
 
-        ok = bool(exit_res.get("ok")) and bool(entry_res.get("ok"))
-        return {"ok": ok, "event": "flatten_then_new_entry", "to": desired}
+        return {"ok": True, "queued": True, "event": "flatten_then_new_entry", "to": desired}
 
-    entry_res = enter_position(ticker, desired, price, time_str)
+    entry_fut = enter_position(ticker, desired, price, time_str)
 
-    LAST_TRADES[ticker] = {
+    trade = {
         "event": "new_trade",
         "direction": desired,
         "price": price,
         "time": time_str,
-        "ema_snapshot": EMA_STATE.get(ticker),
-        "tp_result": entry_res.get("tp_result"),
+        "ema_snapshot": ema_snapshot(ticker),
+        "tp_result": None,
     }
+    LAST_TRADES.set(ticker, trade)
+    entry_fut.add_done_callback(_store_tp_result(trade, "tp_result"))
 
-    return {"ok": entry_res.get("ok", False), "event": "new_trade", "direction": desired}
+    return {"ok": True, "queued": True, "event": "new_trade", "direction": desired}
 
 
 def handle_exit_for_ticker(ticker: str, price: Optional[float], time_str: Optional[str]) -> dict:
@@ -223,109 +517,210 @@ def handle_exit_for_ticker(ticker: str, price: Optional[float], time_str: Option
     if price is not None:
         payload["price"] = price
 
-    result = send_to_traderspost(payload)
+    fut = send_to_traderspost_async(payload)
 
-    POSITION_STATE[ticker] = {
+    POSITION_STATE.update(ticker, {
         "open": False,
         "direction": None,
         "qty": 0,
         "closed_time": time_str,
         "price": price,
-    }
+    })
 
-    LAST_TRADES[ticker] = {
+    trade: Dict[str, Any] = {
         "event": "exit",
         "price": price,
         "time": time_str,
-        "tp_result": result,
+        "tp_result": None,
     }
+    LAST_TRADES.set(ticker, trade)
+    fut.add_done_callback(_store_tp_result(trade, "tp_result"))
 
-    return {"ok": result.get("ok", False), "event": "exit"}
+    return {"ok": True, "queued": True, "event": "exit"}
 
 
 # ------------ ROUTES ------------
 
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    raw_body = request.get_data(as_text=True) or ""
-    logger.info("Incoming body: %r", raw_body)
+def ojsonify(obj: Any, status: int = 200):
+    """jsonify() replacement that serializes with orjson."""
+    body = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return app.response_class(body, status=status, mimetype="application/json")
+
+
+def trade_response(result: dict):
+    """202 Accepted when TradersPost calls were queued, 200 otherwise."""
+    return ojsonify(result, 202 if result.get("queued") else 200)
 
-    # 1) Try JSON (EMA updates etc.)
-    data = None
+
+def handle_json_body(raw_body: bytes):
+    """JSON bodies: EMA updates (plus any pending Titan trade they unlock)."""
     try:
-        data = json.loads(raw_body)
-    except Exception:
+        data = orjson.loads(raw_body)
+    except orjson.JSONDecodeError:
         data = None
 
-    if isinstance(data, dict) and data:
-        if data.get("type") == "ema_update":
-            ticker = update_ema_state_from_json(data)
+    if not isinstance(data, dict) or not data:
+        return ojsonify({"ok": False, "error": "unrecognized payload"}, 400)
+
+    if data.get("type") == "ema_update":
+        ticker = data.get("ticker")
+        if not isinstance(ticker, str) or not ticker:
+            logger.warning("ema_update without valid ticker: %s", data)
+            return ojsonify({"ok": False, "error": "ema_update requires a ticker string"}, 400)
+
+        # Hold the ticker lock across update + consume so a concurrent Titan
+        # alert can't park a pending trade in between and miss this update.
+        with ticker_lock(ticker):
+            update_ema_state_from_json(data)
 
             # If we have a pending Titan trade for this ticker, fire it now
-            if ticker and ticker in PENDING_TRADES:
-                pending = PENDING_TRADES.pop(ticker)
+            pending = PENDING_TRADES.pop(ticker)
+            if pending and monotonic_ts() - pending["created_mono"] > PENDING_TRADE_TTL:
+                return drop_stale_pending_trade(ticker, pending)
+            if pending:
                 logger.info("Consuming pending trade for %s with latest EMA state.", ticker)
                 result = handle_new_trade_for_ticker(ticker, pending.get("price"), pending.get("time"))
-                return jsonify(result), 200
+                return trade_response(result)
 
-            return jsonify({"ok": True, "event": "ema_update_only"}), 200
+        return ojsonify({"ok": True, "event": "ema_update_only"})
 
-        return jsonify({"ok": False, "error": f"unknown json type {data.get('type')}"}), 400
+    return ojsonify({"ok": False, "error": f"unknown json type {data.get('type')}"}, 400)
 
-    # 2) Plain text: Titan / Exit
 
-    titan = parse_titan_new_trade(raw_body)
-    if titan:
-        ticker = titan["ticker"]
-        price = titan.get("price")
-        now = utc_ts()
+def drop_stale_pending_trade(ticker: str, pending: Dict[str, Any]):
+    """Report a parked Titan trade that waited too long for its EMA update."""
+    report_dropped_pending_trade(ticker, pending)
+    return ojsonify({"ok": True, "event": "pending_trade_expired"})
 
-        state = EMA_STATE.get(ticker)
-        use_immediate = False
-        age = None
 
-        if state and "received_at" in state:
-            age = now - state["received_at"]
-            if age <= 5.0:
-                use_immediate = True
+def handle_titan_alert(ticker: str, price: float):
+    """Fire a New Trade Design now if EMA is fresh, else park it as pending."""
+    now = monotonic_ts()
+
+    state = EMA_STATE.get(ticker)
+    use_immediate = False
+    age = None
 
-        if use_immediate:
-            logger.info("Titan trade for %s with fresh EMA (age=%.2fs). Firing immediately.", ticker, age)
-            result = handle_new_trade_for_ticker(ticker, price, None)
-            return jsonify(result), 200
+    if state and "received_mono" in state:
+        age = now - state["received_mono"]
+        if age <= 5.0:
+            use_immediate = True
 
-        # EMA stale/missing -> queue pending
-        PENDING_TRADES[ticker] = {"price": price, "time": None, "created_at": now}
-        logger.info("Stored pending trade for %s: %s", ticker, PENDING_TRADES[ticker])
-        return jsonify({"ok": True, "event": "pending_trade_stored"}), 200
+    if use_immediate:
+        logger.info("Titan trade for %s with fresh EMA (age=%.2fs). Firing immediately.", ticker, age)
+        result = handle_new_trade_for_ticker(ticker, price, None)
+        return trade_response(result)
 
-    exit_info = parse_exit_signal(raw_body)
-    if exit_info:
-        ticker = exit_info["ticker"]
-        price = exit_info.get("price")
-        result = handle_exit_for_ticker(ticker, price, None)
-        return jsonify(result), 200
+    # EMA stale/missing -> queue pending
+    pending = {"price": price, "time": None, "created_at": time.time(), "created_mono": now}
+    PENDING_TRADES.set(ticker, pending)
+    logger.info("Stored pending trade for %s: %s", ticker, pending)
+    return ojsonify({"ok": True, "event": "pending_trade_stored"})
 
-    return jsonify({"ok": False, "error": "unrecognized payload"}), 400
+
+def handle_text_alert(raw_body: bytes):
+    """Plain-text bodies: Titan New Trade Design / Exit Signal."""
+    alert = parse_alert(raw_body)
+    if alert is None:
+        return ojsonify({"ok": False, "error": "unrecognized payload"}, 400)
+
+    kind, ticker, price = alert
+
+    with ticker_lock(ticker):
+        if kind == ALERT_NEW_TRADE:
+            return handle_titan_alert(ticker, price)
+        return trade_response(handle_exit_for_ticker(ticker, price, None))
+
+
+def webhook(raw_body: bytes):
+    """POST /webhook handler; served by FastWebhookMiddleware, not the router."""
+    logger.info("Incoming body: %r", raw_body)
+
+    # Dispatch on the first non-whitespace character: EMA update JSON never
+    # reaches the alert regex and text alerts never reach the JSON parser.
+    # Only a bounded head is stripped so large bodies aren't copied here.
+    first = raw_body[:512].lstrip()[:1]
+    if first == b"{":
+        return handle_json_body(raw_body)
+    if first.isalnum():
+        return handle_text_alert(raw_body)
+
+    return ojsonify({"ok": False, "error": "unrecognized payload"}, 400)
 
 
 @app.route("/", methods=["GET"])
 def health():
-    return jsonify({"ok": True, "message": "Titan Bot webhook running (EMA13 + pending queue + single contract + updated ticker regex)"})
+    return ojsonify({"ok": True, "message": "Titan Bot webhook running (EMA13 + pending queue + single contract + updated ticker regex)"})
 
 
 @app.route("/dashboard", methods=["GET"])
 def dashboard():
-    return jsonify(
-        {
-            "ema_state": EMA_STATE,
-            "last_trades": LAST_TRADES,
-            "positions": POSITION_STATE,
-            "pending_trades": PENDING_TRADES,
-        }
-    )
+    # TTL expiry happens silently inside the cache; purge it here so it marks
+    # the body dirty only when entries were actually removed.
+    LAST_TRADES.expire()
+    PENDING_TRADES.expire()
+
+    body = _DASHBOARD_CACHE["bytes"]
+    if body is None or _DASHBOARD_CACHE["dirty"]:
+        # One rebuilder at a time, so an older snapshot can never overwrite a
+        # newer one. The flag is cleared before snapshotting so a write racing
+        # the rebuild marks the cache dirty again instead of being lost.
+        with _DASHBOARD_LOCK:
+            body = _DASHBOARD_CACHE["bytes"]
+            if body is None or _DASHBOARD_CACHE["dirty"]:
+                _DASHBOARD_CACHE["dirty"] = False
+                body = orjson.dumps(
+                    {
+                        "ema_state": EMA_STATE.snapshot(),
+                        "last_trades": LAST_TRADES.snapshot(),
+                        "positions": POSITION_STATE.snapshot(),
+                        "pending_trades": PENDING_TRADES.snapshot(),
+                    },
+                    option=orjson.OPT_NON_STR_KEYS,
+                )
+                _DASHBOARD_CACHE["bytes"] = body
+    return app.response_class(body, mimetype="application/json")
+
+
+# TradingView alerts and EMA updates are a few hundred bytes; anything past
+# this is never read.
+MAX_WEBHOOK_BODY = 4096
+
+
+def _read_wsgi_body(environ: dict) -> bytes:
+    stream = environ["wsgi.input"]
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    if length > 0:
+        return stream.read(min(length, MAX_WEBHOOK_BODY))
+    if environ.get("wsgi.input_terminated"):  # chunked body, server-delimited
+        return stream.read(MAX_WEBHOOK_BODY)
+    return b""
+
+
+class FastWebhookMiddleware:
+    """
+    Serve POST /webhook straight from the WSGI environ.
+
+    The webhook is the only hot endpoint, so it skips Werkzeug URL matching
+    and Flask request-context setup; everything else goes to Flask as usual.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") == "/webhook" and environ.get("REQUEST_METHOD") == "POST":
+            return webhook(_read_wsgi_body(environ))(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+app.wsgi_app = FastWebhookMiddleware(app.wsgi_app)
 
 
+# Local debugging only; production runs under gunicorn (see Procfile).
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     app.run(host="0.0.0.0", port=port)